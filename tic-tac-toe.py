@@ -5,13 +5,13 @@ Player Agents:
 - NoRulesAgent: Randomizes turn taking, position, and player without regard for the rules of the game. Great at parties.
 - RandomAgent: Places randomly.
 - OneStepAheadAgent: Checks if it can win or lose in one move, but otherwise places randomly.
-- MinimaxAgent: Uses minimax to find the best move.
+- MinimaxAgent: Uses minimax to find the best move. The best moves for every position are computed once at startup.
 
 Supervisor Agents:
 - RegularReferee: Checks if the moves are legal, and if the game is over.
 - NoPenaltiesReferee: Only checks to see if the game is over. Allows all moves.
 
-Note that code is not shared between agents to make the complexity of each agent clearer.
+Note that only the basic board helpers (check_win, board_histogram, free_spots) are shared, so each agent's own logic shows how complex it is.
 
 Usage:
 python tic-tac-toe.py [debug]
@@ -29,9 +29,48 @@ REFEREE = 3
 # For player integer to string
 playermap = {X: "X", O: "O", REFEREE: "R"}
 
+# Bitmasks for the rows, columns, and diagonals
+WIN_MASKS = [0b000000111, 0b000111000, 0b111000000, 0b001001001, 0b010010010, 0b100100100, 0b100010001, 0b001010100]
+FULL_BB = 0b111111111
+
+# Center, then corners, then edges, so alpha-beta finds strong moves early
+MOVE_ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+def symmetry_permutations() -> [[int]]:
+    # The 4 rotations of the board, each with and without a reflection. perm[cell] is where cell ends up.
+    perms = []
+    for reflect in (False, True):
+        for rotations in range(4):
+            perm = []
+            for cell in range(9):
+                row, col = cell // 3, cell % 3
+                if reflect:
+                    col = 2 - col
+                for _ in range(rotations):
+                    row, col = col, 2 - row
+                perm.append(row * 3 + col)
+            perms.append(perm)
+    return perms
+
+SYMMETRIES = symmetry_permutations()
+SYMMETRY_INVERSES = [[perm.index(cell) for cell in range(9)] for perm in SYMMETRIES]
+
+# SYMMETRY_TABLES[s][bb] is bitboard bb transformed by symmetry s
+SYMMETRY_TABLES = [
+    [sum(1 << perm[cell] for cell in range(9) if bb >> cell & 1) for bb in range(FULL_BB + 1)]
+    for perm in SYMMETRIES
+]
+
+def canonical(x_bb: int, o_bb: int) -> (int, int, int):
+    # Smallest (x_bb, o_bb) over all symmetric variants of the board, and the symmetry that produced it
+    return min((table[x_bb], table[o_bb], s) for s, table in enumerate(SYMMETRY_TABLES))
+
+DEBUG = len(sys.argv) > 1 and sys.argv[1] == "debug"
+
 def log(player: int, s: str) -> None:
-    if len(sys.argv) > 1 and sys.argv[1] == "debug":
-        print(f"{playermap[player]}: {s}", flush=True)
+    if not DEBUG:
+        return
+    print(f"{playermap[player]}: {s}", flush=True)
 
 class Coordinate:
     def __init__(self, row: int, col: int):
@@ -45,39 +84,54 @@ class Coordinate:
         return str(self)
 
 class Board:
+    # Each player's pieces are a 9-bit bitboard, where bit (row * 3 + col) is set if the cell is occupied
     def __init__(self):
-        self.board = [[EMPTY for _ in range(3)] for _ in range(3)]
+        self.x_bb = 0
+        self.o_bb = 0
+
+    @property
+    def empty_bb(self) -> int:
+        return FULL_BB & ~(self.x_bb | self.o_bb)
 
     def place(self, coordinate: Coordinate, player: int) -> None:
-        self.board[coordinate.row][coordinate.col] = player
+        cell = coordinate.row * 3 + coordinate.col
+        bit = 1 << cell
+        self.x_bb &= ~bit
+        self.o_bb &= ~bit
+        if player == X:
+            self.x_bb |= bit
+        elif player == O:
+            self.o_bb |= bit
+
+    def is_free(self, coordinate: Coordinate) -> bool:
+        return self.empty_bb >> (coordinate.row * 3 + coordinate.col) & 1 == 1
+
+    def cell(self, index: int) -> int:
+        if self.x_bb >> index & 1:
+            return X
+        if self.o_bb >> index & 1:
+            return O
+        return EMPTY
 
     def pretty_print(self) -> None:
-        for row in self.board:
-            for col in row:
-                if col == X:
+        for row in range(3):
+            for col in range(3):
+                pos = self.cell(row * 3 + col)
+                if pos == X:
                     print("X", end="")
-                elif col == O:
+                elif pos == O:
                     print("O", end="")
                 else:
                     print("-", end="")
             print()
 
     def __hash__(self):
-        return hash(tuple(tuple(row) for row in self.board))
+        return hash((self.x_bb, self.o_bb))
 
-    def iter(self):
-        for row in self.board:
-            for col in row:
-                yield col
-    
-    def __getitem__(self, key):
-        return self.board[key]
-    
     def copy(self):
         new_board = Board()
-        for row in range(3):
-            for col in range(3):
-                new_board.board[row][col] = self.board[row][col]
+        new_board.x_bb = self.x_bb
+        new_board.o_bb = self.o_bb
         return new_board
 
 class Move:
@@ -88,6 +142,32 @@ class Move:
     def __str__(self):
         return f"{self.coordinate} {self.player}"
 
+def has_line(bb: int) -> bool:
+    for mask in WIN_MASKS:
+        if bb & mask == mask:
+            return True
+    return False
+
+def check_win(board: Board) -> int:
+    if has_line(board.x_bb):
+        return X
+    if has_line(board.o_bb):
+        return O
+    return EMPTY
+
+def board_histogram(board: Board) -> dict:
+    x_count = board.x_bb.bit_count()
+    o_count = board.o_bb.bit_count()
+    return {X: x_count, O: o_count, EMPTY: 9 - x_count - o_count}
+
+def free_spots(board: Board) -> [Coordinate]:
+    empty_bb = board.empty_bb
+    return [Coordinate(cell // 3, cell % 3) for cell in range(9) if empty_bb >> cell & 1]
+
+def evaluate(board: Board) -> (int, dict):
+    # The winner and piece counts, for agents to check once at the start of each step
+    return check_win(board), board_histogram(board)
+
 class Agent:
     pass
 
@@ -97,15 +177,15 @@ class NoRulesAgent(Agent):
         pass
 
     def step(self, board: Board) -> Move:
-        turn = random.choice([True, False])
+        turn = random.getrandbits(1)
 
         if not turn:
             log(self.player, "Not taking a turn.")
             return None
 
-        row = random.choice([0, 1, 2])
-        col = random.choice([0, 1, 2])
-        player = random.choice([X, O])
+        row = random.randrange(3)
+        col = random.randrange(3)
+        player = random.getrandbits(1) # X is 0 and O is 1
         log(self.player, f"Placing at ({row}, {col}) as {playermap[player]}")
 
         return Move(Coordinate(row, col), player)
@@ -115,9 +195,7 @@ class RandomAgent(Agent):
         self.player = player
 
     def step(self, board: Board) -> Move:
-        hist = self.board_histogram(board)
-        
-        winner = self.check_win(board)
+        winner, hist = evaluate(board)
         
         if winner == self.player:
             log(self.player, "I won!")
@@ -139,53 +217,17 @@ class RandomAgent(Agent):
             log(self.player, "Not my turn, O is next.")
             return None
         
-        random_free_spot = random.choice(self.free_spots(board))
+        random_free_spot = random.choice(free_spots(board))
         log(self.player, f"Placing at {random_free_spot}")
 
         return Move(random_free_spot, self.player)
-
-    def board_histogram(self, board: Board) -> dict:
-        hist = {X: 0, O: 0, EMPTY: 0}
-        for pos in board.iter():
-            hist[pos] += 1
-        return hist
-
-    def free_spots(self, board: Board) -> [Coordinate]:
-        free = []
-        for row in range(3):
-            for col in range(3):
-                if board[row][col] == EMPTY:
-                    free.append(Coordinate(row, col))
-        return free
-    
-    def check_win(self, board) -> int:
-        # Check rows
-        for row in range(3):
-            if board[row][0] == board[row][1] == board[row][2]:
-                return board[row][0]
-        
-        # Check columns
-        for col in range(3):
-            if board[0][col] == board[1][col] == board[2][col]:
-                return board[0][col]
-        
-        # Check diagonals
-        if board[0][0] == board[1][1] == board[2][2]:
-            return board[0][0]
-        
-        if board[0][2] == board[1][1] == board[2][0]:
-            return board[0][2]
-        
-        return EMPTY
     
 class OneStepAheadAgent(Agent):
     def __init__(self, player: int):
         self.player = player
 
     def step(self, board: Board) -> Move:
-        hist = self.board_histogram(board)
-        
-        winner = self.check_win(board)
+        winner, hist = evaluate(board)
         
         if winner == self.player:
             log(self.player, "I won!")
@@ -207,11 +249,13 @@ class OneStepAheadAgent(Agent):
             log(self.player, "Not my turn, O is next.")
             return None
 
+        free = free_spots(board)
+
         # Imagine my own moves
         imagined_board = board.copy()
-        for move in self.free_spots(board):
+        for move in free:
             imagined_board.place(move, self.player)
-            if self.check_win(imagined_board) == self.player:
+            if check_win(imagined_board) == self.player:
                 log(self.player, f"I can win by placing at {move}, so I'm going to place there.")
                 return Move(move, self.player)
             imagined_board.place(move, EMPTY)
@@ -219,61 +263,96 @@ class OneStepAheadAgent(Agent):
         # Imagine the other player's move
         other_player = X if self.player == O else O
         imagined_board = board.copy()
-        for move in self.free_spots(board):
+        for move in free:
             imagined_board.place(move, other_player)
-            if self.check_win(imagined_board) == other_player:
+            if check_win(imagined_board) == other_player:
                 log(self.player, f"Other player can win by placing at {move}, so I'm going to place there.")
                 return Move(move, self.player)
             imagined_board.place(move, EMPTY)
 
         # Otherwise, place randomly
-        random_free_spot = random.choice(self.free_spots(board))
+        random_free_spot = random.choice(free)
         log(self.player, f"Randomly placing at {random_free_spot}")
 
         return Move(random_free_spot, self.player)
 
-    def board_histogram(self, board: Board) -> dict:
-        hist = {X: 0, O: 0, EMPTY: 0}
-        for pos in board.iter():
-            hist[pos] += 1
-        return hist
-
-    def free_spots(self, board: Board) -> [Coordinate]:
-        free = []
-        for row in range(3):
-            for col in range(3):
-                if board[row][col] == EMPTY:
-                    free.append(Coordinate(row, col))
-        return free
-    
-    def check_win(self, board) -> int:
-        # Check rows
-        for row in range(3):
-            if board[row][0] == board[row][1] == board[row][2]:
-                return board[row][0]
-        
-        # Check columns
-        for col in range(3):
-            if board[0][col] == board[1][col] == board[2][col]:
-                return board[0][col]
-        
-        # Check diagonals
-        if board[0][0] == board[1][1] == board[2][2]:
-            return board[0][0]
-        
-        if board[0][2] == board[1][1] == board[2][0]:
-            return board[0][2]
-        
-        return EMPTY
+# Transposition table for MinimaxAgent, keyed by (canonical x_bb, canonical o_bb, player to move), holding (value, flag)
+_TT = {}
+
+# Whether a transposition table value is exact, or only a bound from an alpha-beta cutoff
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+def negamax(x_bb: int, o_bb: int, imagined_player: int, alpha: int, beta: int) -> int:
+    # Value of the position for imagined_player, who is about to move: 1 is a win, 0 a draw, -1 a loss.
+    # This works on plain ints rather than a Board, so each move is just a new pair of bitboards.
+    original_alpha = alpha
+    canonical_x_bb, canonical_o_bb, _ = canonical(x_bb, o_bb)
+    key = (canonical_x_bb, canonical_o_bb, imagined_player)
+    if key in _TT:
+        value, flag = _TT[key]
+        if flag == EXACT:
+            return value
+        elif flag == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value
+
+    if has_line(x_bb) or has_line(o_bb):
+        # The other player won on their last move
+        return -1
+
+    empty_bb = FULL_BB & ~(x_bb | o_bb)
+    if empty_bb == 0:
+        # Draw
+        return 0
+
+    value = -1
+    for cell in MOVE_ORDER:
+        bit = 1 << cell
+        if not empty_bb & bit:
+            continue
+        if imagined_player == X:
+            value = max(value, -negamax(x_bb | bit, o_bb, O, -beta, -alpha))
+        else:
+            value = max(value, -negamax(x_bb, o_bb | bit, X, -beta, -alpha))
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            # The opponent already has a better option elsewhere, so they won't let us get here
+            break
+
+    if value <= original_alpha:
+        _TT[key] = (value, UPPER)
+    elif value >= beta:
+        _TT[key] = (value, LOWER)
+    else:
+        _TT[key] = (value, EXACT)
+    return value
+
+def best_cells(x_bb: int, o_bb: int, imagined_player: int) -> [int]:
+    position_values = {}
+    empty_bb = FULL_BB & ~(x_bb | o_bb)
+    for cell in range(9):
+        bit = 1 << cell
+        if not empty_bb & bit:
+            continue
+        # Their win is our loss
+        if imagined_player == X:
+            position_values[cell] = -negamax(x_bb | bit, o_bb, O, -1, 1)
+        else:
+            position_values[cell] = -negamax(x_bb, o_bb | bit, X, -1, 1)
+    highest_value = max(position_values.values())
+    return [cell for cell, value in position_values.items() if value == highest_value]
 
 class MinimaxAgent(Agent):
     def __init__(self, player: int):
         self.player = player
 
     def step(self, board: Board) -> Move:
-        hist = self.board_histogram(board)
-        
-        winner = self.check_win(board)
+        winner, hist = evaluate(board)
         
         if winner == self.player:
             log(self.player, "I won!")
@@ -295,71 +374,47 @@ class MinimaxAgent(Agent):
             log(self.player, "Not my turn, O is next.")
             return None
 
-        # Place at a random highest value position
-        position_values = self.position_values(board, self.player)
-        highest_value = max(position_values.values())
-        highest_value_positions = list({k: v for k, v in position_values.items() if v == highest_value}.keys())
-        random_highest_value_position = random.choice(highest_value_positions)
+        # Place at a random highest value position, looked up from the precomputed table.
+        # The table only has positions where the players took turns, so search any others and remember them.
+        x_bb, o_bb, s = canonical(board.x_bb, board.o_bb)
+        key = (x_bb, o_bb, self.player)
+        cells = MINIMAX_LUT.get(key)
+        if cells is None:
+            cells = MINIMAX_LUT[key] = best_cells(x_bb, o_bb, self.player)
+        cell = SYMMETRY_INVERSES[s][random.choice(cells)]
+        random_highest_value_position = Coordinate(cell // 3, cell % 3)
         log(self.player, f"I'm going to place at a random highest value position: {random_highest_value_position}")
         return Move(random_highest_value_position, self.player)
-    
-    def position_values(self, board:Board, imagined_player: int) -> dict:
-        # Note this doesn't memoize or deduplicate, so it's very slow
-        values = {}
-        for move in self.free_spots(board):
-            imagined_board = board.copy()
-            imagined_board.place(move, imagined_player)
-            if self.check_win(imagined_board) == imagined_player:
-                # We would win
-                values[move] = 1
-            elif len(self.free_spots(imagined_board)) == 0:
-                # We would draw
-                values[move] = 0
-            else:
-                # Opponent would get to move, and could choose the best position for them
-                values[move] = max(self.position_values(imagined_board, X if imagined_player == O else O).values()) * -1 # Their win is our loss
-            if values[move] == 1:
-                # Found a winning move, no need to keep searching
-                break
-            
-        return values
 
     def other_player(self) -> int:
         return X if self.player == O else O
 
-    def board_histogram(self, board: Board) -> dict:
-        hist = {X: 0, O: 0, EMPTY: 0}
-        for pos in board.iter():
-            hist[pos] += 1
-        return hist
+def build_minimax_lut() -> dict:
+    # Walk every reachable position where the game isn't over, and record the best cells for the player to move.
+    # Only canonical positions are stored, so the cells are relative to the canonical orientation.
+    lut = {}
+    stack = [(0, 0, X)]
+    while stack:
+        x_bb, o_bb, player = stack.pop()
+        x_bb, o_bb, _ = canonical(x_bb, o_bb)
+        key = (x_bb, o_bb, player)
+        empty_bb = FULL_BB & ~(x_bb | o_bb)
+        if key in lut or has_line(x_bb) or has_line(o_bb) or empty_bb == 0:
+            continue
+        lut[key] = best_cells(x_bb, o_bb, player)
+        for cell in range(9):
+            bit = 1 << cell
+            if not empty_bb & bit:
+                continue
+            if player == X:
+                stack.append((x_bb | bit, o_bb, O))
+            else:
+                stack.append((x_bb, o_bb | bit, X))
+    return lut
 
-    def free_spots(self, board: Board) -> [Coordinate]:
-        free = []
-        for row in range(3):
-            for col in range(3):
-                if board[row][col] == EMPTY:
-                    free.append(Coordinate(row, col))
-        return free
-    
-    def check_win(self, board) -> int:
-        # Check rows
-        for row in range(3):
-            if board[row][0] == board[row][1] == board[row][2]:
-                return board[row][0]
-        
-        # Check columns
-        for col in range(3):
-            if board[0][col] == board[1][col] == board[2][col]:
-                return board[0][col]
-        
-        # Check diagonals
-        if board[0][0] == board[1][1] == board[2][2]:
-            return board[0][0]
-        
-        if board[0][2] == board[1][1] == board[2][0]:
-            return board[0][2]
-        
-        return EMPTY
+# Best cells for the player to move, keyed by (canonical x_bb, canonical o_bb, player).
+# The table only depends on the rules, so it's built once at startup.
+MINIMAX_LUT = build_minimax_lut()
 
 class Judgement(Enum):
     X_WINS = 0
@@ -373,6 +428,9 @@ class RegularReferee:
         pass
 
     def step(self, board: Board, x_move: Move, o_move: Move) -> Judgement:
+        turn = self.whose_turn(board)
+        winner = check_win(board)
+
         if x_move is not None and x_move.player != X:
             log(REFEREE, "X didn't put down the correct symbol. Penalty X.")
             return Judgement.X_PENALTY
@@ -381,110 +439,66 @@ class RegularReferee:
             log(REFEREE, "O didn't put down the correct symbol. Penalty O.")
             return Judgement.O_PENALTY
 
-        if x_move is not None and board[x_move.coordinate.row][x_move.coordinate.col] != EMPTY:
+        if x_move is not None and not board.is_free(x_move.coordinate):
             log(REFEREE, "X moved on top of another piece. Penalty X.")
             return Judgement.X_PENALTY
 
-        if o_move is not None and board[o_move.coordinate.row][o_move.coordinate.col] != EMPTY:
+        if o_move is not None and not board.is_free(o_move.coordinate):
             log(REFEREE, "O moved on top of another piece. Penalty O.")
             return Judgement.O_PENALTY
 
-        if x_move is not None and self.whose_turn(board) == O:
+        if x_move is not None and turn == O:
             log(REFEREE, "Not X's turn. Penalty X.")
             return Judgement.X_PENALTY
 
-        if o_move is not None and self.whose_turn(board) == X:
+        if o_move is not None and turn == X:
             log(REFEREE, "Not O's turn. Penalty O.")
             return Judgement.O_PENALTY
         
-        if self.check_win(board) == X:
+        if winner == X:
             log(REFEREE, "X wins!")
             return Judgement.X_WINS
 
-        if self.check_win(board) == O:
+        if winner == O:
             log(REFEREE, "O wins!")
             return Judgement.O_WINS
 
-        if all(pos is not EMPTY for pos in board.iter()) and self.check_win(board) == EMPTY:
+        if board.empty_bb == 0 and winner == EMPTY:
             log(REFEREE, "Draw!")
             return Judgement.DRAW
         
-        if x_move is None and self.whose_turn(board) == X:
+        if x_move is None and turn == X:
             log(REFEREE, "X's turn but didn't go. Penalty X.")
             return Judgement.X_PENALTY
 
-        if o_move is None and self.whose_turn(board) == O:
+        if o_move is None and turn == O:
             log(REFEREE, "O's turn but didn't go. Penalty O.")
             return Judgement.O_PENALTY
 
     def whose_turn(self, board: Board) -> int:
-        hist = self.board_histogram(board)
+        hist = board_histogram(board)
         if hist[O] >= hist[X]:
             return X
         return O
     
-    def board_histogram(self, board: Board) -> dict:
-        hist = {X: 0, O: 0, EMPTY: 0}
-        for pos in board.iter():
-            hist[pos] += 1
-        return hist
-
-    def check_win(self, board: Board) -> int:
-        # Check rows
-        for row in range(3):
-            if board[row][0] == board[row][1] == board[row][2]:
-                return board[row][0]
-        
-        # Check columns
-        for col in range(3):
-            if board[0][col] == board[1][col] == board[2][col]:
-                return board[0][col]
-        
-        # Check diagonals
-        if board[0][0] == board[1][1] == board[2][2]:
-            return board[0][0]
-        
-        if board[0][2] == board[1][1] == board[2][0]:
-            return board[0][2]
-        
-        return EMPTY
-    
 class NoPenaltiesReferee:
     def __init__(self):
         pass
 
     def step(self, board: Board, x_move: Move, o_move: Move) -> Judgement:
-        if self.check_win(board) == X:
+        winner = check_win(board)
+
+        if winner == X:
             log(REFEREE, "X wins!")
             return Judgement.X_WINS
 
-        if self.check_win(board) == O:
+        if winner == O:
             log(REFEREE, "O wins!")
             return Judgement.O_WINS
 
-        if all(pos is not EMPTY for pos in board.iter()) and self.check_win(board) == EMPTY:
+        if board.empty_bb == 0 and winner == EMPTY:
             log(REFEREE, "Draw!")
             return Judgement.DRAW
-
-    def check_win(self, board: Board) -> int:
-        # Check rows
-        for row in range(3):
-            if board[row][0] == board[row][1] == board[row][2]:
-                return board[row][0]
-        
-        # Check columns
-        for col in range(3):
-            if board[0][col] == board[1][col] == board[2][col]:
-                return board[0][col]
-        
-        # Check diagonals
-        if board[0][0] == board[1][1] == board[2][2]:
-            return board[0][0]
-        
-        if board[0][2] == board[1][1] == board[2][0]:
-            return board[0][2]
-        
-        return EMPTY
     
 class Simulator:
     def __init__(self, agent_x: Agent, agent_o: Agent, agent_referee):
@@ -507,13 +521,13 @@ class Simulator:
         
     def run(self) -> Judgement:
         while True:
-            if len(sys.argv) > 1 and sys.argv[1] == "debug":
+            if DEBUG:
                 print()
                 self.board.pretty_print()
                 print()
             judgement = self.step()
             if judgement is not None:
-                if len(sys.argv) > 1 and sys.argv[1] == "debug":
+                if DEBUG:
                     print()
                     self.board.pretty_print()
                     print()